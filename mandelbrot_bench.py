@@ -0,0 +1,218 @@
+"""
+Mandelbrot 引擎基准测试
+
+固定的命名场景 × 若干尺寸 × 若干 max_iter，测量：
+  - 逃逸场计算耗时、Mpixel/s、iter/s（朴素等价迭代数：逃逸点按 nu、集内点按 max_iter 计，
+    与引擎内部是否跳过计算无关，因此引擎优化会直接体现为 iter/s 上升）；
+  - 着色耗时（colorize，查找表量化 + 查表 + Image.fromarray）；
+  - 峰值内存（tracemalloc，单独一轮测量，不影响计时）。
+结果写入 JSON；--compare 与保存的基线对比，超过阈值的退化会被标出并以非零状态退出。
+
+用法示例：
+  - 生成基线：
+      python mandelbrot_bench.py --output baseline.json
+  - 修改引擎后对比（吞吐下降或峰值内存上升超过 10% 判为退化）：
+      python mandelbrot_bench.py --output new.json --compare baseline.json --threshold 0.10
+  - 只跑部分场景/尺寸：
+      python mandelbrot_bench.py --scenes full,seahorse --sizes 256 --max-iters 512
+  - 多核加速比曲线（--workers 给出时附加测量，结果写入 JSON 的 speedup 字段）：
+      python mandelbrot_bench.py --scenes full --sizes 2048 --max-iters 1024 --workers 1,2,4,8,16,32
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+
+import numpy as np
+
+from mandelbrot import Viewport, colorize, compute_field, measure_speedup
+
+# 名称 -> (中心, 视图宽度)；中心用字符串保存，深度场景也能无损构造 Viewport
+SCENES = {
+    "full": (("-0.75", "0.0"), 3.5),
+    "seahorse": (("-0.7436438870", "0.1318259042"), 2e-3),
+    "elephant": (("0.2850", "0.0110"), 2e-2),
+    "spiral": (("-0.77468061062690", "-0.13741688560379"), 1e-9),
+    # 周期 3 圆盘内部：不在闭式判定范围内，每个像素都要迭代满 max_iter
+    "interior": (("-0.1226", "0.7449"), 2e-2),
+    "exterior": (("1.5", "1.5"), 0.5),
+}
+DEFAULT_SIZES = (256, 512)
+DEFAULT_MAX_ITERS = (256, 1024)
+
+
+def scene_viewport(name: str) -> Viewport:
+    (cx, cy), scale = SCENES[name]
+    hp = (Decimal(cx), Decimal(cy))
+    return Viewport(center=complex(float(hp[0]), float(hp[1])), scale=scale, center_hp=hp)
+
+
+def _naive_iterations(smooth: np.ndarray, escaped: np.ndarray, max_iter: int) -> float:
+    """朴素逐像素迭代的等价迭代次数。"""
+    n_escaped = int(escaped.sum())
+    return float(smooth[escaped].sum(dtype=np.float64)) * max_iter + (escaped.size - n_escaped) * max_iter
+
+
+def run_case(scene: str, size: int, max_iter: int, palette: str = "hsv", repeat: int = 3,
+             method: str = "scan", periodicity: bool = False) -> dict:
+    """单个用例：计时取 repeat 次中的最小值，峰值内存另跑一轮测量。"""
+    viewport = scene_viewport(scene)
+    compute_s = colour_s = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        smooth, escaped = compute_field(size, size, max_iter, viewport, periodicity=periodicity,
+                                        method=method)
+        t1 = time.perf_counter()
+        colorize(smooth, escaped, palette)
+        t2 = time.perf_counter()
+        compute_s = min(compute_s, t1 - t0)
+        colour_s = min(colour_s, t2 - t1)
+
+    iterations = _naive_iterations(smooth, escaped, max_iter)
+    del smooth, escaped
+    tracemalloc.start()
+    try:
+        colorize(*compute_field(size, size, max_iter, viewport, periodicity=periodicity,
+                                method=method), palette)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    pixels = size * size
+    return {
+        "scene": scene, "size": size, "max_iter": max_iter,
+        "compute_s": round(compute_s, 6),
+        "colour_s": round(colour_s, 6),
+        "mpix_s": round(pixels / compute_s / 1e6, 4),
+        "iter_s": round(iterations / compute_s, 1),
+        "peak_mb": round(peak / 2 ** 20, 3),
+    }
+
+
+def case_key(case: dict) -> str:
+    return f"{case['scene']}/{case['size']}/{case['max_iter']}"
+
+
+def run_suite(scenes, sizes, max_iters, palette: str = "hsv", repeat: int = 3,
+              method: str = "scan", periodicity: bool = False, log=print) -> dict:
+    cases = []
+    for scene in scenes:
+        for size in sizes:
+            for max_iter in max_iters:
+                case = run_case(scene, size, max_iter, palette, repeat, method, periodicity)
+                cases.append(case)
+                if log:
+                    log(f"{case_key(case):<24} {case['compute_s']:>9.4f}s {case['mpix_s']:>9.3f} Mpix/s "
+                        f"{case['iter_s'] / 1e6:>9.1f} Miter/s  colour {case['colour_s'] * 1e3:>7.2f}ms  "
+                        f"peak {case['peak_mb']:>8.2f}MB")
+    return {
+        "env": {"python": platform.python_version(), "numpy": np.__version__,
+                "machine": platform.machine(), "cpus": os.cpu_count()},
+        "config": {"palette": palette, "repeat": repeat, "method": method, "periodicity": periodicity},
+        "cases": cases,
+    }
+
+
+def run_speedup(scenes, sizes, max_iters, worker_counts: list[int], backend: str = "thread",
+                repeat: int = 3, log=print) -> list[dict]:
+    """多核加速比曲线：每个用例按 worker_counts 逐一计时（repeat 次取最小），加速比相对第一项。"""
+    curves = []
+    for scene in scenes:
+        for size in sizes:
+            for max_iter in max_iters:
+                best = {}
+                for _ in range(repeat):
+                    for n, seconds, _ in measure_speedup(size, size, max_iter, scene_viewport(scene),
+                                                         worker_counts, backend):
+                        best[n] = min(best.get(n, float("inf")), seconds)
+                base = best[worker_counts[0]]
+                points = [{"workers": n, "compute_s": round(best[n], 6), "speedup": round(base / best[n], 3)}
+                          for n in worker_counts]
+                curves.append({"scene": scene, "size": size, "max_iter": max_iter, "backend": backend,
+                               "points": points})
+                if log:
+                    key = f"{scene}/{size}/{max_iter}"
+                    log(f"{key:<24} {backend:<8} " + "  ".join(
+                        f"{pt['workers']}:{pt['speedup']:.2f}x" for pt in points))
+    return curves
+
+
+def compare(result: dict, baseline: dict, threshold: float = 0.10) -> list[str]:
+    """
+    与基线逐用例对比，返回退化描述列表：
+    吞吐（mpix_s）下降、着色耗时或峰值内存上升超过 threshold（相对值）即判为退化。
+    """
+    base = {case_key(c): c for c in baseline["cases"]}
+    regressions = []
+    for case in result["cases"]:
+        old = base.get(case_key(case))
+        if old is None:
+            continue
+        checks = (
+            ("mpix_s", old["mpix_s"] / max(case["mpix_s"], 1e-12) - 1.0),
+            ("colour_s", case["colour_s"] / max(old["colour_s"], 1e-12) - 1.0),
+            ("peak_mb", case["peak_mb"] / max(old["peak_mb"], 1e-12) - 1.0),
+        )
+        for metric, worse in checks:
+            if worse > threshold:
+                regressions.append(f"{case_key(case)} {metric}: {old[metric]} -> {case[metric]} "
+                                   f"(+{worse:.1%} worse)")
+    return regressions
+
+
+def _int_list(s: str) -> list[int]:
+    return [int(v) for v in s.split(",") if v]
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Mandelbrot 引擎基准测试")
+    p.add_argument("--scenes", type=str, default=",".join(SCENES),
+                   help=f"逗号分隔的场景名（可选：{', '.join(SCENES)}）")
+    p.add_argument("--sizes", type=_int_list, default=list(DEFAULT_SIZES), help="逗号分隔的边长（正方形图像）")
+    p.add_argument("--max-iters", type=_int_list, default=list(DEFAULT_MAX_ITERS), help="逗号分隔的 max_iter")
+    p.add_argument("--palette", type=str, default="hsv", help="着色用的调色盘")
+    p.add_argument("--repeat", type=int, default=3, help="每个用例重复次数（取最小耗时）")
+    p.add_argument("--method", choices=["scan", "mariani"], default="scan", help="逃逸场计算方式")
+    p.add_argument("--periodicity", action="store_true", help="启用轨道周期检测")
+    p.add_argument("--workers", type=_int_list, default=None,
+                   help="逗号分隔的 worker 数（如 1,2,4,8）：给出时附加测量多核加速比曲线")
+    p.add_argument("--backend", choices=["thread", "process"], default="thread", help="加速比曲线使用的并行后端")
+    p.add_argument("--output", type=str, default="bench.json", help="结果 JSON 路径")
+    p.add_argument("--compare", type=str, default=None, help="基线 JSON 路径，对比并报告退化")
+    p.add_argument("--threshold", type=float, default=0.10, help="退化阈值（相对值，默认 0.10）")
+    args = p.parse_args(argv)
+
+    scenes = [s for s in args.scenes.split(",") if s]
+    unknown = [s for s in scenes if s not in SCENES]
+    if unknown:
+        p.error(f"未知的场景: {', '.join(unknown)}")
+
+    result = run_suite(scenes, args.sizes, args.max_iters, args.palette, args.repeat,
+                       args.method, args.periodicity)
+    if args.workers:
+        result["speedup"] = run_speedup(scenes, args.sizes, args.max_iters, args.workers, args.backend,
+                                        args.repeat)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"Saved: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        print(f"Compared with {args.compare}: {len(regressions)} regression(s) above {args.threshold:.0%}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""
+Mandelbrot XYZ 瓦片服务器（asyncio，纯本地，仅依赖标准库 + numpy + pillow）
+
+路由：
+  GET /{palette}/{z}/{x}/{y}.png   一块 256×256 的 PNG 瓦片（slippy map 的 XYZ 约定，y 向下）
+  GET /                            JSON：瓦片 URL 模板、可用调色盘与运行统计
+
+瓦片 (z, x, y) 对应 mandelbrot.tile_bounds 的金字塔：第 z 级把 TILE_WORLD 见方的区域切成 2^z × 2^z 块。
+逃逸场由 mandelbrot_escape_smooth 在像素中心采样（中心用 Decimal 精确给出，深层级自动走微扰引擎）。
+- 渲染（迭代 + 着色 + PNG 编码）在进程池中进行，事件循环从不阻塞；
+- 同一瓦片的并发请求合并为一次渲染；
+- 最近返回的 PNG 按 LRU 保留在内存中；
+- 客户端在渲染完成前断开（地图平移走了）时，若该瓦片已无其他等待者，取消尚未开始的渲染；
+- --cache-dir 让 worker 把逃逸场存入 DiskFieldCache，换调色盘或重启后同一瓦片不再迭代。
+
+用法示例：
+  python mandelbrot_server.py --port 8080 --workers 4 --max-iter auto
+  # Leaflet/OpenLayers 的瓦片图层 URL：http://127.0.0.1:8080/hsv/{z}/{x}/{y}.png
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import re
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, localcontext
+
+from mandelbrot import (PALETTES, TILE_ORIGIN, TILE_SIZE, TILE_WORLD, DiskFieldCache, Viewport,
+                        auto_max_iter, colorize, mandelbrot_escape_smooth, palette_lut, parse_max_iter)
+
+# 超过该层级的瓦片小于 Decimal 参考轨道之外任何东西能分辨的范围，直接拒绝
+MAX_ZOOM = 160
+_TILE_PATH = re.compile(r"^/([A-Za-z0-9_-]+)/(\d+)/(\d+)/(\d+)\.png$")
+
+# worker 进程状态：由 _worker_init 设置
+_STORE: DiskFieldCache | None = None
+
+
+def _worker_init(cache_dir: str | None) -> None:
+    global _STORE
+    for name in PALETTES:
+        palette_lut(name)
+    _STORE = DiskFieldCache(cache_dir) if cache_dir else None
+
+
+def tile_max_iter(z: int, max_iter: int | str) -> int:
+    """固定值原样返回；auto 时只取决于层级，相邻瓦片的着色保持连续。"""
+    if max_iter == "auto":
+        return auto_max_iter(TILE_WORLD / (1 << z))
+    return max_iter
+
+
+def tile_viewport(z: int, x: int, y: int) -> Viewport:
+    """瓦片的视图：中心用 Decimal 精确计算，跨度取首末像素中心之间的距离（linspace 正好落在像素中心）。"""
+    side = Decimal(TILE_WORLD) / (1 << z)
+    with localcontext() as ctx:
+        ctx.prec = 30 + z * 31 // 100  # 十进制位数随层级增长，保证中心不丢精度
+        cx = Decimal(TILE_ORIGIN[0]) + (x + Decimal("0.5")) * side
+        cy = Decimal(TILE_ORIGIN[1]) + (y + Decimal("0.5")) * side
+    scale = float(side) * (TILE_SIZE - 1) / TILE_SIZE
+    return Viewport(center=complex(float(cx), float(cy)), scale=scale, center_hp=(cx, cy))
+
+
+def render_tile_png(palette: str, z: int, x: int, y: int, max_iter: int) -> bytes:
+    """在 worker 中执行：取（或计算）瓦片逃逸场，着色并编码为 PNG。"""
+    key = DiskFieldCache.key("xyz", z, x, y, TILE_SIZE, max_iter)
+    field = _STORE.get(key) if _STORE is not None else None
+    if field is None:
+        field = mandelbrot_escape_smooth(TILE_SIZE, TILE_SIZE, max_iter, tile_viewport(z, x, y))
+        if _STORE is not None:
+            _STORE.put(key, field)
+    buf = io.BytesIO()
+    colorize(*field, palette).save(buf, format="PNG", compress_level=3)
+    return buf.getvalue()
+
+
+class TileServer:
+    """瓦片请求的合并、LRU 与取消逻辑；HTTP 解析见 handle()。"""
+
+    def __init__(self, max_iter: int | str = "auto", workers: int = 1, cache_tiles: int = 2048,
+                 cache_dir: str | None = None):
+        self.max_iter = max_iter
+        self.cache_tiles = cache_tiles
+        self.workers = workers
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_worker_init,
+                                        initargs=(cache_dir,))
+        self._lru: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._inflight: dict[tuple, list] = {}  # 键 -> [渲染 future, 等待者数]
+        self.stats = {"requests": 0, "lru_hits": 0, "rendered": 0, "merged": 0, "cancelled": 0}
+
+    async def tile(self, palette: str, z: int, x: int, y: int) -> bytes:
+        key = (palette, z, x, y)
+        png = self._lru.get(key)
+        if png is not None:
+            self._lru.move_to_end(key)
+            self.stats["lru_hits"] += 1
+            return png
+
+        job = self._inflight.get(key)
+        if job is None:
+            loop = asyncio.get_running_loop()
+            fut = loop.run_in_executor(self.pool, render_tile_png, palette, z, x, y,
+                                       tile_max_iter(z, self.max_iter))
+            job = self._inflight[key] = [fut, 0]
+            fut.add_done_callback(lambda f, key=key: self._finish(key, f))
+        else:
+            self.stats["merged"] += 1
+        job[1] += 1
+        try:
+            return await asyncio.shield(job[0])
+        finally:
+            job[1] -= 1
+            if job[1] == 0 and not job[0].done():
+                # 最后一个等待者也走了：尚未开始的渲染直接取消
+                job[0].cancel()
+                if self._inflight.get(key) is job:
+                    del self._inflight[key]
+                self.stats["cancelled"] += 1
+
+    def _finish(self, key: tuple, fut: asyncio.Future) -> None:
+        job = self._inflight.get(key)
+        if job is not None and job[0] is fut:
+            del self._inflight[key]
+        if fut.cancelled() or fut.exception() is not None:
+            return
+        self.stats["rendered"] += 1
+        self._lru[key] = fut.result()
+        while len(self._lru) > self.cache_tiles:
+            self._lru.popitem(last=False)
+
+    def route(self, path: str) -> tuple | None:
+        m = _TILE_PATH.match(path.split("?", 1)[0])
+        if m is None:
+            return None
+        palette, z, x, y = m.group(1), int(m.group(2)), int(m.group(3)), int(m.group(4))
+        if palette not in PALETTES or z > MAX_ZOOM or x >= 1 << z or y >= 1 << z:
+            return None
+        return palette, z, x, y
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+        parts = head.split(b"\r\n", 1)[0].decode("latin-1").split()
+        self.stats["requests"] += 1
+        try:
+            if len(parts) < 2 or parts[0] not in ("GET", "HEAD"):
+                await self._respond(writer, 405, b"method not allowed\n", "text/plain")
+            elif parts[1] == "/":
+                info = {"tiles": "/{palette}/{z}/{x}/{y}.png", "tile_size": TILE_SIZE,
+                        "palettes": sorted(PALETTES), "max_zoom": MAX_ZOOM, "stats": self.stats}
+                await self._respond(writer, 200, json.dumps(info).encode(), "application/json")
+            else:
+                key = self.route(parts[1])
+                if key is None:
+                    await self._respond(writer, 404, b"not found\n", "text/plain")
+                else:
+                    await self._serve_tile(reader, writer, key, head_only=parts[0] == "HEAD")
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _serve_tile(self, reader, writer, key: tuple, head_only: bool = False) -> None:
+        render = asyncio.ensure_future(self.tile(*key))
+        # 渲染期间监听连接：读到 EOF 说明客户端已放弃这块瓦片
+        gone = asyncio.ensure_future(reader.read(1))
+        while True:
+            done, _ = await asyncio.wait({render, gone}, return_when=asyncio.FIRST_COMPLETED)
+            if render in done:
+                break
+            if gone.result() == b"":
+                render.cancel()
+                await asyncio.gather(render, return_exceptions=True)
+                return
+            gone = asyncio.ensure_future(reader.read(1))
+        gone.cancel()
+        try:
+            png = render.result()
+        except Exception as e:
+            await self._respond(writer, 500, f"{type(e).__name__}: {e}\n".encode(), "text/plain")
+            return
+        await self._respond(writer, 200, png, "image/png", head_only,
+                            extra="Cache-Control: public, max-age=86400\r\n")
+
+    @staticmethod
+    async def _respond(writer, status: int, body: bytes, content_type: str, head_only: bool = False,
+                       extra: str = "") -> None:
+        reason = {200: "OK", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}[status]
+        writer.write((f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n"
+                      f"Content-Length: {len(body)}\r\nAccess-Control-Allow-Origin: *\r\n{extra}"
+                      f"Connection: close\r\n\r\n").encode("latin-1"))
+        if not head_only:
+            writer.write(body)
+        await writer.drain()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> asyncio.AbstractServer:
+        """
+        先拉起 worker 再开始监听：fork 出来的子进程会继承父进程当时打开的套接字，
+        若在处理请求时才懒启动进程池，已关闭的客户端连接会因子进程仍持有 fd 而收不到 EOF。
+        """
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, os.getpid)
+                               for _ in range(self.workers)))
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080) -> None:
+        server = await self.start(host, port)
+        addr = server.sockets[0].getsockname()
+        print(f"Serving tiles on http://{addr[0]}:{addr[1]}/{{palette}}/{{z}}/{{x}}/{{y}}.png", flush=True)
+        async with server:
+            await server.serve_forever()
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Mandelbrot XYZ 瓦片服务器")
+    p.add_argument("--host", type=str, default="127.0.0.1", help="监听地址（默认只监听本机）")
+    p.add_argument("--port", type=int, default=8080, help="监听端口")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="渲染进程数")
+    p.add_argument("--max-iter", type=parse_max_iter, default="auto",
+                   help="每块瓦片的最大迭代次数；auto 按层级自动选择")
+    p.add_argument("--cache-tiles", type=int, default=2048, help="内存中保留的最近瓦片数（LRU）")
+    p.add_argument("--cache-dir", type=str, default=None, help="磁盘逃逸场缓存目录（跨调色盘、跨重启复用）")
+    args = p.parse_args(argv)
+
+    server = TileServer(args.max_iter, args.workers, args.cache_tiles, args.cache_dir)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())